@@ -6,6 +6,7 @@ import HTMLParser
 import json
 import logging
 import os
+import pickle
 import re
 import tempfile
 import threading
@@ -15,6 +16,7 @@ from devil.android import apk_helper
 from pylib import constants
 from pylib.constants import host_paths
 from pylib.base import base_test_result
+from pylib.base import test_exception
 from pylib.base import test_instance
 from pylib.symbols import stack_symbolizer
 from pylib.utils import test_filter
@@ -68,6 +70,9 @@ _DEPS_EXCLUSION_LIST = [
     'webkit/data/ico_decoder',
 ]
 
+_DISABLED_TESTS_FILTER_DIR = os.path.join(
+    host_paths.DIR_SOURCE_ROOT, 'build', 'android', 'pylib', 'gtest', 'filter')
+
 
 _EXTRA_NATIVE_TEST_ACTIVITY = (
     'org.chromium.native_test.NativeTestInstrumentationTestRunner.'
@@ -81,6 +86,8 @@ _EXTRA_SHARD_SIZE_LIMIT = (
     'org.chromium.native_test.NativeTestInstrumentationTestRunner.'
         'ShardSizeLimit')
 
+_PICKLE_FORMAT_VERSION = 1
+
 # TODO(jbudorick): Remove these once we're no longer parsing stdout to generate
 # results.
 _RE_TEST_STATUS = re.compile(
@@ -105,10 +112,16 @@ _RE_TEST_CURRENTLY_RUNNING = re.compile(r'\[ERROR:.*?\]'
                                     r' Currently running: (.*)')
 _RE_DISABLED = re.compile(r'DISABLED_')
 _RE_FLAKY = re.compile(r'FLAKY_')
+_DISABLED_PREFIX_RES = [_RE_DISABLED, _RE_FLAKY]
 
 # Detect stack line in stdout.
 _STACK_LINE_RE = re.compile(r'\s*#\d+')
 
+
+class TestListPickleException(test_exception.TestException):
+  pass
+
+
 def ParseGTestListTests(raw_list):
   """Parses a raw test list as provided by --gtest_list_tests.
 
@@ -140,7 +153,7 @@ def ParseGTestListTests(raw_list):
       test = test.strip()
       if test and not 'YOU HAVE' in test:
         test_name = test.split()[0]
-        ret += [current + test_name]
+        ret.append(current + test_name)
   return ret
 
 
@@ -280,6 +293,40 @@ def ParseGTestJSON(json_content):
   return results
 
 
+def GetTestsFromPickle(pickle_path, test_mtime, flags):
+  """Returns the test list cached by SaveTestsToPickle.
+
+  Args:
+    pickle_path: Path to the pickled test list.
+    test_mtime: Modification time of the test binary the list was taken from.
+    flags: The flags the test binary was listed with.
+  Raises:
+    TestListPickleException if the pickle is missing or out of date.
+  """
+  if not os.path.exists(pickle_path):
+    raise TestListPickleException('%s does not exist.' % pickle_path)
+  if os.path.getmtime(pickle_path) <= test_mtime:
+    raise TestListPickleException('File is stale: %s' % pickle_path)
+
+  with open(pickle_path, 'r') as f:
+    pickle_data = pickle.load(f)
+  if pickle_data['VERSION'] != _PICKLE_FORMAT_VERSION:
+    raise TestListPickleException('PICKLE_FORMAT_VERSION has changed.')
+  if pickle_data['FLAGS'] != flags:
+    raise TestListPickleException('Flags have changed.')
+  return pickle_data['TESTS']
+
+
+def SaveTestsToPickle(pickle_path, tests, flags):
+  pickle_data = {
+    'VERSION': _PICKLE_FORMAT_VERSION,
+    'FLAGS': flags,
+    'TESTS': tests,
+  }
+  with open(pickle_path, 'w') as pickle_file:
+    pickle.dump(pickle_data, pickle_file)
+
+
 def TestNameWithoutDisabledPrefix(test_name):
   """Modify the test name without disabled prefix if prefix 'DISABLED_' or
   'FLAKY_' presents.
@@ -289,8 +336,7 @@ def TestNameWithoutDisabledPrefix(test_name):
   Returns:
     A test name without prefix 'DISABLED_' or 'FLAKY_'.
   """
-  disabled_prefixes = [_RE_DISABLED, _RE_FLAKY]
-  for dp in disabled_prefixes:
+  for dp in _DISABLED_PREFIX_RES:
     test_name = dp.sub('', test_name)
   return test_name
 
@@ -318,13 +364,14 @@ class GtestTestInstance(test_instance.TestInstance):
     self._total_external_shards = args.test_launcher_total_shards
     self._wait_for_java_debugger = args.wait_for_java_debugger
 
+    out_dir = constants.GetOutDirectory()
+
     # GYP:
     if args.executable_dist_dir:
       self._exe_dist_dir = os.path.abspath(args.executable_dist_dir)
     else:
       # TODO(agrieve): Remove auto-detection once recipes pass flag explicitly.
-      exe_dist_dir = os.path.join(constants.GetOutDirectory(),
-                                  '%s__dist' % self._suite)
+      exe_dist_dir = os.path.join(out_dir, '%s__dist' % self._suite)
 
       if os.path.exists(exe_dist_dir):
         self._exe_dist_dir = exe_dist_dir
@@ -339,7 +386,7 @@ class GtestTestInstance(test_instance.TestInstance):
       self._test_launcher_batch_limit = args.test_launcher_batch_limit
 
     apk_path = os.path.join(
-        constants.GetOutDirectory(), '%s_apk' % self._suite,
+        out_dir, '%s_apk' % self._suite,
         '%s-debug%s.apk' % (self._suite, incremental_part))
     self._test_apk_incremental_install_json = (
         args.test_apk_incremental_install_json)
@@ -363,6 +410,7 @@ class GtestTestInstance(test_instance.TestInstance):
       error_func('Could not find apk or executable for %s' % self._suite)
 
     self._data_deps = []
+    self._disabled_filter_strings = {}
     self._gtest_filter = test_filter.InitializeFilterFromArgs(args)
     self._run_disabled = args.run_disabled
 
@@ -570,6 +618,15 @@ class GtestTestInstance(test_instance.TestInstance):
     return filtered_test_list
 
   def _GenerateDisabledFilterString(self, disabled_prefixes):
+    # The disabled tests file is read once per set of prefixes since tests
+    # are filtered again on every iteration.
+    key = tuple(disabled_prefixes) if disabled_prefixes is not None else None
+    if key not in self._disabled_filter_strings:
+      self._disabled_filter_strings[key] = (
+          self._GenerateDisabledFilterStringUncached(disabled_prefixes))
+    return self._disabled_filter_strings[key]
+
+  def _GenerateDisabledFilterStringUncached(self, disabled_prefixes):
     disabled_filter_items = []
 
     if disabled_prefixes is None:
@@ -583,9 +640,8 @@ class GtestTestInstance(test_instance.TestInstance):
     disabled_filter_items += ['*.%s*' % dp for dp in disabled_prefixes]
 
     disabled_tests_file_path = os.path.join(
-        host_paths.DIR_SOURCE_ROOT, 'build', 'android', 'pylib', 'gtest',
-        'filter', '%s_disabled' % self._suite)
-    if disabled_tests_file_path and os.path.exists(disabled_tests_file_path):
+        _DISABLED_TESTS_FILTER_DIR, '%s_disabled' % self._suite)
+    if os.path.exists(disabled_tests_file_path):
       with open(disabled_tests_file_path) as disabled_tests_file:
         disabled_filter_items += [
             '%s' % l for l in (line.strip() for line in disabled_tests_file)
@@ -4,7 +4,9 @@
 
 import contextlib
 import collections
+import heapq
 import itertools
+import json
 import logging
 import os
 import posixpath
@@ -107,6 +109,76 @@ def _ExtractTestsFromFilter(gtest_filter):
   return patterns
 
 
+def _PartitionTests(tests, count, durations):
+  """Distributes tests into groups with roughly equal expected run time.
+
+  Uses the longest-processing-time-first heuristic: tests are considered in
+  descending order of expected duration and each one is added to the group
+  with the smallest total so far. When no durations are known this is
+  equivalent to a round-robin split.
+
+  Args:
+    tests: The list of tests to distribute.
+    count: The number of groups to create.
+    durations: A dict mapping tests to their last known duration. Tests that
+      are missing from it are assumed to take the average known duration.
+
+  Returns:
+    A list of |count| lists of tests. Within each list, tests keep the order
+    they had in |tests|.
+  """
+  known = [durations[t] for t in tests if t in durations]
+  default_duration = float(sum(known)) / len(known) if known else 1
+
+  def weight(test):
+    return durations.get(test, default_duration)
+
+  groups = [[] for _ in xrange(count)]
+  # Ties are broken by group size so that zero-duration tests still spread.
+  loads = [(0, 0, i) for i in xrange(count)]
+  for index, test in sorted(
+      enumerate(tests), key=lambda x: weight(x[1]), reverse=True):
+    load, size, group = heapq.heappop(loads)
+    groups[group].append((index, test))
+    heapq.heappush(loads, (load + weight(test), size + 1, group))
+
+  return [[t for _, t in sorted(g)] for g in groups]
+
+
+def _GetTestCaseName(test):
+  """Returns the test case part of |test|, or None if it has none."""
+  test_case, sep, _ = test.partition('.')
+  return test_case if sep else None
+
+
+def _CompactTestFilter(tests, test_case_sizes):
+  """Returns gtest filter patterns that match exactly |tests|.
+
+  Test cases whose tests are all in |tests| are collapsed into a single
+  'TestCase.*' pattern to keep the --gtest_filter argument short.
+
+  Args:
+    tests: The list of tests to match.
+    test_case_sizes: A dict mapping test case names to the number of tests the
+      binary lists for that case.
+
+  Returns:
+    A list of gtest filter patterns.
+  """
+  tests_by_case = collections.OrderedDict()
+  for test in tests:
+    tests_by_case.setdefault(_GetTestCaseName(test), []).append(test)
+
+  patterns = []
+  for test_case, case_tests in tests_by_case.iteritems():
+    if (test_case is not None
+        and len(set(case_tests)) == test_case_sizes.get(test_case)):
+      patterns.append('%s.*' % test_case)
+    else:
+      patterns.extend(case_tests)
+  return patterns
+
+
 def _PullCoverageFiles(device, device_coverage_dir, output_dir):
   """Pulls coverage files on device to host directory.
 
@@ -193,9 +265,28 @@ class _ApkDelegate(object):
           reinstall=True,
           permissions=self._permissions)
 
+  def GetPushTuples(self):
+    # pylint: disable=no-self-use
+    # The test code is installed with the apk rather than pushed.
+    return []
+
   def ResultsDirectory(self, device):
     return device.GetApplicationDataDirectory(self._package)
 
+  def GetTestListPicklePath(self):
+    return '%s-list-tests.pickle' % self._apk_helper.path
+
+  def GetTestBinaryMtime(self):
+    paths = [self._apk_helper.path]
+    # For incremental APKs, the native code doesn't live in the apk, so also
+    # check the timestamps of the native libraries.
+    if self._test_apk_incremental_install_json:
+      with open(self._test_apk_incremental_install_json) as f:
+        data = json.load(f)
+      out_dir = constants.GetOutDirectory()
+      paths += [os.path.join(out_dir, p) for p in data['native_libs']]
+    return max(os.path.getmtime(p) for p in paths)
+
   def Run(self, test, device, flags=None, **kwargs):
     extras = dict(self._extras)
     device_api = device.build_version_sdk
@@ -304,16 +395,27 @@ class _ExeDelegate(object):
     return posixpath.join(constants.TEST_EXECUTABLE_DIR, 'chromium_tests_root')
 
   def Install(self, device):
-    # TODO(jbudorick): Look into merging this with normal data deps pushing if
-    # executables become supported on nonlocal environments.
-    device.PushChangedFiles([(self._host_dist_dir, self._device_dist_dir)],
-                            delete_device_stale=True)
+    # pylint: disable=no-self-use
+    # pylint: disable=unused-argument
+    # The executable is pushed along with the data dependencies so that all
+    # changed files are sent to the device in a single batch.
+    pass
+
+  def GetPushTuples(self):
+    return [(self._host_dist_dir, self._device_dist_dir)]
 
   def ResultsDirectory(self, device):
     # pylint: disable=no-self-use
     # pylint: disable=unused-argument
     return constants.TEST_EXECUTABLE_DIR
 
+  def GetTestListPicklePath(self):
+    return '%s-list-tests.pickle' % self._host_dist_dir
+
+  def GetTestBinaryMtime(self):
+    return os.path.getmtime(
+        os.path.join(self._host_dist_dir, self._exe_file_name))
+
   def Run(self, test, device, flags=None, **kwargs):
     tool = self._test_run.GetTool(device).GetTestWrapper()
     if tool:
@@ -323,7 +425,8 @@ class _ExeDelegate(object):
     cmd.append(posixpath.join(self._device_dist_dir, self._exe_file_name))
 
     if test:
-      cmd.append('--gtest_filter=%s' % ':'.join(test))
+      patterns = _CompactTestFilter(test, self._test_run.test_case_sizes)
+      cmd.append('--gtest_filter=%s' % ':'.join(patterns))
     if flags:
       # TODO(agrieve): This won't work if multiple flags are passed.
       cmd.append(flags)
@@ -389,6 +492,16 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
     # pylint: enable=redefined-variable-type
     self._crashes = set()
     self._servers = collections.defaultdict(list)
+    # Durations of previously run tests, used to balance shards on retries
+    # and repeats.
+    self._test_durations = {}
+    # Number of tests the binary lists for each test case. Empty when the test
+    # list was taken from the filter rather than from the binary.
+    self._test_case_sizes = {}
+
+  @property
+  def test_case_sizes(self):
+    return self._test_case_sizes
 
   #override
   def TestPackage(self):
@@ -410,6 +523,7 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
         host_device_tuples_substituted = [
             (h, local_device_test_run.SubstituteDeviceRoot(d, device_root))
             for h, d in host_device_tuples]
+        host_device_tuples_substituted += self._delegate.GetPushTuples()
         local_device_environment.place_nomedia_on_device(dev, device_root)
         dev.PushChangedFiles(
             host_device_tuples_substituted,
@@ -434,12 +548,12 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
           # listen on ipv6, but ssh remote forwarding does. 5037 is the port
           # number adb uses for its server.
           if "[::1]:5037" in subprocess.check_output(
-              "ss -o state listening 'sport = 5037'", shell=True):
+              ['ss', '-o', 'state', 'listening', 'sport = 5037']):
             logging.error(
                 'Test Server cannot be started with a remote-forwarded adb '
                 'server. Continuing anyways, but some tests may fail.')
             return
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, OSError):
           pass
 
         self._servers[str(dev)] = []
@@ -497,13 +611,25 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
 
     batch_size = self._test_instance.test_launcher_batch_limit
 
-    for i in xrange(0, device_count):
-      unbounded_shard = tests[i::device_count]
-      shards += [
+    durations = {}
+    for t in tests:
+      name = gtest_test_instance.TestNameWithoutDisabledPrefix(t)
+      if name in self._test_durations:
+        durations[t] = self._test_durations[name]
+
+    batches = []
+    for unbounded_shard in _PartitionTests(tests, device_count, durations):
+      batches += [
           unbounded_shard[j:j + batch_size]
           for j in xrange(0, len(unbounded_shard), batch_size)
       ]
-    return shards
+
+    # Hand out the longest batches first so that devices finish at roughly
+    # the same time.
+    if durations:
+      batches.sort(
+          key=lambda b: sum(durations.get(t, 0) for t in b), reverse=True)
+    return shards + batches
 
   #override
   def _GetTests(self):
@@ -515,6 +641,34 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
       if tests:
         return tests
 
+    flags = [
+        f for f in self._test_instance.flags
+        if f not in ['--wait-for-debugger', '--wait-for-java-debugger']
+    ]
+    flags.append('--gtest_list_tests')
+
+    # Listing tests on the device takes several seconds, so the list is cached
+    # next to the test binary until the binary or the flags change.
+    pickle_path = self._delegate.GetTestListPicklePath()
+    try:
+      tests = gtest_test_instance.GetTestsFromPickle(
+          pickle_path, self._delegate.GetTestBinaryMtime(), flags)
+    except gtest_test_instance.TestListPickleException as e:
+      logging.info('Could not get tests from pickle: %s', e)
+      tests = self._ListTestsOnDevices(flags)
+      gtest_test_instance.SaveTestsToPickle(pickle_path, tests, flags)
+
+    self._test_case_sizes = collections.Counter(
+        _GetTestCaseName(t) for t in tests)
+    self._test_case_sizes.pop(None, None)
+
+    tests = self._test_instance.FilterTests(tests)
+    tests = self._ApplyExternalSharding(
+        tests, self._test_instance.external_shard_index,
+        self._test_instance.total_external_shards)
+    return tests
+
+  def _ListTestsOnDevices(self, flags):
     # Even when there's only one device, it still makes sense to retrieve the
     # test list so that tests can be split up and run in batches rather than all
     # at once (since test output is not streamed).
@@ -526,12 +680,6 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
       if self._test_instance.wait_for_java_debugger:
         timeout = None
 
-      flags = [
-          f for f in self._test_instance.flags
-          if f not in ['--wait-for-debugger', '--wait-for-java-debugger']
-      ]
-      flags.append('--gtest_list_tests')
-
       # TODO(crbug.com/726880): Remove retries when no longer necessary.
       for i in range(0, retries+1):
         logging.info('flags:')
@@ -563,12 +711,7 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
     if all(not tl for tl in test_lists):
       raise device_errors.CommandFailedError(
           'Failed to list tests on any device')
-    tests = list(sorted(set().union(*[set(tl) for tl in test_lists if tl])))
-    tests = self._test_instance.FilterTests(tests)
-    tests = self._ApplyExternalSharding(
-        tests, self._test_instance.external_shard_index,
-        self._test_instance.total_external_shards)
-    return tests
+    return list(sorted(set().union(*[set(tl) for tl in test_lists if tl])))
 
   def _UploadTestArtifacts(self, device, test_artifacts_dir):
     # TODO(jbudorick): Reconcile this with the output manager once
@@ -755,6 +898,8 @@ class LocalDeviceGtestRun(local_device_test_run.LocalDeviceTestRun):
 
     tombstones_url = None
     for r in results:
+      self._test_durations[r.GetName()] = r.GetDuration()
+
       if logcat_file:
         r.SetLink('logcat', logcat_file.Link())
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env vpython
+# Copyright 2020 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+# pylint: disable=protected-access
+
+import unittest
+
+from pylib.local.device import local_device_gtest_run
+
+
+class LocalDeviceGtestRunTest(unittest.TestCase):
+
+  def testPartitionTests_noDurations(self):
+    tests = ['A.a', 'A.b', 'A.c', 'B.a', 'B.b']
+    self.assertEquals(
+        [['A.a', 'A.c', 'B.b'], ['A.b', 'B.a']],
+        local_device_gtest_run._PartitionTests(tests, 2, {}))
+
+  def testPartitionTests_coversAllTests(self):
+    tests = ['T.%d' % i for i in xrange(11)]
+    durations = {'T.1': 50, 'T.4': 5, 'T.9': 20}
+    for count in xrange(1, 13):
+      groups = local_device_gtest_run._PartitionTests(tests, count, durations)
+      self.assertEquals(count, len(groups))
+      self.assertEquals(sorted(tests), sorted(sum(groups, [])))
+
+  def testPartitionTests_zeroDurations(self):
+    tests = ['A.a', 'A.b', 'A.c', 'B.a']
+    durations = {t: 0 for t in tests}
+    self.assertEquals(
+        [['A.a', 'A.c'], ['A.b', 'B.a']],
+        local_device_gtest_run._PartitionTests(tests, 2, durations))
+
+  def testPartitionTests_balancesDurations(self):
+    tests = ['A.a', 'A.b', 'A.c', 'A.d']
+    durations = {'A.a': 100, 'A.b': 10, 'A.c': 10, 'A.d': 80}
+    self.assertEquals(
+        [['A.a'], ['A.b', 'A.c', 'A.d']],
+        local_device_gtest_run._PartitionTests(tests, 2, durations))
+
+  def testPartitionTests_unknownDurationsUseAverage(self):
+    tests = ['A.a', 'A.b', 'A.c']
+    durations = {'A.a': 30, 'A.b': 10}
+    self.assertEquals(
+        [['A.a'], ['A.b', 'A.c']],
+        local_device_gtest_run._PartitionTests(tests, 2, durations))
+
+  def testCompactTestFilter_wholeTestCases(self):
+    tests = ['A.a', 'A.b', 'B.a', 'C.a', 'C.b']
+    sizes = {'A': 2, 'B': 1, 'C': 3}
+    self.assertEquals(
+        ['A.*', 'B.*', 'C.a', 'C.b'],
+        local_device_gtest_run._CompactTestFilter(tests, sizes))
+
+  def testCompactTestFilter_noSizes(self):
+    tests = ['A.a', 'A.b']
+    self.assertEquals(
+        tests, local_device_gtest_run._CompactTestFilter(tests, {}))
+
+  def testCompactTestFilter_parameterizedTests(self):
+    tests = ['P/A.a/0', 'P/A.a/1', 'A.a']
+    sizes = {'P/A': 2, 'A': 2}
+    self.assertEquals(
+        ['P/A.*', 'A.a'],
+        local_device_gtest_run._CompactTestFilter(tests, sizes))
+
+  def testCompactTestFilter_testWithoutTestCase(self):
+    self.assertEquals(
+        ['a'], local_device_gtest_run._CompactTestFilter(['a'], {None: 1}))
+
+
+if __name__ == '__main__':
+  unittest.main(verbosity=2)
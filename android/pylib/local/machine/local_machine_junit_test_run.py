@@ -27,6 +27,9 @@ from py_utils import tempfile_ext
 _EXCLUDED_CLASSES_PREFIXES = ('android', 'junit', 'org/bouncycastle/util',
                               'org/hamcrest', 'org/junit', 'org/mockito')
 
+# Maximum number of bytes read from a shard's stdout pipe at a time.
+_READ_CHUNK_SIZE = 64 * 1024
+
 # Suites we shouldn't shard, usually because they don't contain enough test
 # cases.
 _EXCLUDED_SUITES = {
@@ -250,14 +253,17 @@ def PrintProcessesStdout(procs):
   while streams:
     rstreams, _, _ = select.select(streams, [], [])
     for stream in rstreams:
-      line = stream.readline()
-      if line:
+      # Drain whatever is ready in one read rather than calling readline(),
+      # which on an unbuffered pipe costs a system call per byte and can
+      # leave data in the file object's buffer where select() cannot see it.
+      data = os.read(stream.fileno(), _READ_CHUNK_SIZE)
+      if data:
         # Print out just one output so user can see work being done rather
         # than waiting for it all at the end.
         if stream.fileno() == first_fd:
-          sys.stdout.write(line)
+          sys.stdout.write(data)
         else:
-          outputs[stream.fileno()].append(line)
+          outputs[stream.fileno()].append(data)
       else:
         streams.remove(stream)  # End of stream.
 
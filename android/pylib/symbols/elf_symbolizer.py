@@ -450,7 +450,7 @@ class ELFSymbolizer(object):
           inline_has_more_lines = inlines and (len(lines_for_one_symbol) == 0 or
                                   (line1 != '??' and line2 != '??:0'))
           if not inlines or inline_has_more_lines:
-            lines_for_one_symbol += [(line1, line2)]
+            lines_for_one_symbol.append((line1, line2))
           if inline_has_more_lines:
             continue
           queue.put(lines_for_one_symbol)
@@ -37,13 +37,16 @@ class Xvfb(object):
       raise Exception('Could not start Xvfb')
     os.environ['DISPLAY'] = ':9'
 
-    # Now confirm, giving a chance for it to start if needed.
-    for _ in range(10):
-      proc = subprocess.Popen('xdpyinfo >/dev/null', shell=True)
-      _, retcode = os.waitpid(proc.pid, 0)
-      if retcode == 0:
-        break
-      time.sleep(0.25)
+    # Now confirm, giving a chance for it to start if needed. Xvfb is usually
+    # ready almost immediately, so poll with a short, growing delay.
+    delay = 0.01
+    with open(os.devnull, 'w') as devnull:
+      for _ in range(16):
+        retcode = subprocess.call(['xdpyinfo'], stdout=devnull, stderr=devnull)
+        if retcode == 0:
+          break
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
     if retcode != 0:
       raise Exception('Could not confirm Xvfb happiness')
 
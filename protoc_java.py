@@ -11,7 +11,7 @@ It performs the following steps:
 1. Deletes all old sources (ensures deleted classes are not part of new jars).
 2. Creates source directory.
 3. Generates Java files using protoc (output into either --java-out-dir or
-   --srcjar).
+   --srcjar, which protoc writes as a zip directly).
 4. Creates a new stamp file.
 """
 
@@ -20,7 +20,6 @@ from __future__ import print_function
 import argparse
 import os
 import shutil
-import subprocess
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'android', 'gyp'))
@@ -40,6 +39,23 @@ def _EnforceJavaPackage(proto_srcs):
                         'line: {}'.format(proto_path))
 
 
+def _RunProtoc(options, out_dir):
+  out_arg = '--java_out=lite:' + out_dir
+
+  proto_path_args = ['--proto_path', options.proto_path]
+  for path in options.import_dir:
+    proto_path_args += ["--proto_path", path]
+
+  # Generate Java files using protoc.
+  build_utils.CheckOutput(
+      [options.protoc] + proto_path_args + [out_arg] + options.protos,
+      # protoc generates superfluous warnings about LITE_RUNTIME deprecation
+      # even though we are using the new non-deprecated method.
+      stderr_filter=lambda output: build_utils.FilterLines(
+          output, '|'.join([r'optimize_for = LITE_RUNTIME', r'java/lite\.md'])
+      ))
+
+
 def main(argv):
   parser = argparse.ArgumentParser()
   build_utils.AddDepfileOption(parser)
@@ -64,27 +80,21 @@ def main(argv):
 
   _EnforceJavaPackage(options.protos)
 
-  with build_utils.TempDir() as temp_dir:
-    out_arg = '--java_out=lite:' + temp_dir
-
-    proto_path_args = ['--proto_path', options.proto_path]
-    for path in options.import_dir:
-      proto_path_args += ["--proto_path", path]
-
-    # Generate Java files using protoc.
-    build_utils.CheckOutput(
-        [options.protoc] + proto_path_args + [out_arg] + options.protos,
-        # protoc generates superfluous warnings about LITE_RUNTIME deprecation
-        # even though we are using the new non-deprecated method.
-        stderr_filter=lambda output: build_utils.FilterLines(
-            output, '|'.join([r'optimize_for = LITE_RUNTIME', r'java/lite\.md'])
-        ))
-
-    if options.java_out_dir:
-      build_utils.DeleteDirectory(options.java_out_dir)
-      shutil.copytree(temp_dir, options.java_out_dir)
-    else:
-      build_utils.ZipDir(options.srcjar, temp_dir)
+  if options.java_out_dir:
+    # Generate directly into the output directory rather than copying a
+    # freshly generated tree over it.
+    build_utils.DeleteDirectory(options.java_out_dir)
+    build_utils.MakeDirectory(options.java_out_dir)
+    _RunProtoc(options, options.java_out_dir)
+  else:
+    with build_utils.TempDir() as temp_dir:
+      # protoc writes a zip archive when the output path ends in .zip, which
+      # avoids writing out every generated file only to read it back in.
+      temp_srcjar = os.path.join(temp_dir, 'srcjar.zip')
+      _RunProtoc(options, temp_srcjar)
+      with build_utils.AtomicOutput(options.srcjar) as f:
+        with open(temp_srcjar, 'rb') as srcjar:
+          shutil.copyfileobj(srcjar, f)
 
   if options.depfile:
     assert options.srcjar
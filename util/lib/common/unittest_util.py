@@ -74,9 +74,9 @@ def GetTestsFromSuite(suite):
   tests = []
   for x in suite:
     if isinstance(x, unittest.TestSuite):
-      tests += GetTestsFromSuite(x)
+      tests.extend(GetTestsFromSuite(x))
     else:
-      tests += [x]
+      tests.append(x)
   return tests
 
 
@@ -141,15 +141,23 @@ def FilterTestNames(all_tests, gtest_filter):
   if negative_patterns:
     neg_pats = re.compile('|'.join(fnmatch.translate(p) for p in
                                    negative_patterns))
+  # Compile each pattern once rather than having fnmatch look it up for every
+  # test. Tests are grouped by the first positive pattern they match.
+  pos_pats = [re.compile(fnmatch.translate(p)) for p in positive_patterns]
 
-  tests = []
+  pattern_tests = [[] for _ in pos_pats]
+  pats_and_tests = list(zip(pos_pats, pattern_tests))
   test_set = set()
-  for pattern in positive_patterns:
-    pattern_tests = [
-        test for test in all_tests
-        if (fnmatch.fnmatch(test, pattern)
-            and not (neg_pats and neg_pats.match(test))
-            and test not in test_set)]
-    tests.extend(pattern_tests)
-    test_set.update(pattern_tests)
+  for test in all_tests:
+    if test in test_set or (neg_pats and neg_pats.match(test)):
+      continue
+    for pos_pat, matching_tests in pats_and_tests:
+      if pos_pat.match(test):
+        matching_tests.append(test)
+        test_set.add(test)
+        break
+
+  tests = []
+  for matching_tests in pattern_tests:
+    tests.extend(matching_tests)
   return tests
@@ -59,6 +59,14 @@ class FilterTestNamesTest(unittest.TestCase):
                           "Foo.Two",
                           "Quux.Two"])
 
+  def testMatchOverlappingWithNegative(self):
+    x = unittest_util.FilterTestNames(self.possible_list,
+                                      "*.Two:Bar.*:F?o.T*-Quux.*:*.One")
+    self.assertEquals(x, ["Foo.Two",
+                          "Bar.Two",
+                          "Bar.Three",
+                          "Foo.Three"])
+
 
 if __name__ == '__main__':
   logging.getLogger().setLevel(logging.DEBUG)